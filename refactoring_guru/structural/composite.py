@@ -1,6 +1,22 @@
 from __future__ import annotations
+import importlib
+import io
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+import timeit
 from abc import ABC, abstractmethod
-from typing import List
+from array import array
+from bisect import bisect_right
+from collections import deque
+from itertools import accumulate, islice
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, TypeVar
+
+T = TypeVar("T")
 
 
 class Component(ABC):
@@ -9,6 +25,9 @@ class Component(ABC):
     complex objects of a composition.
     """
 
+    _parent: Optional[Component] = None
+    _cached: Optional[str] = None
+
     @property
     def parent(self) -> Component:
         return self._parent
@@ -23,6 +42,51 @@ class Component(ABC):
 
         self._parent = parent
 
+    def invalidate(self) -> None:
+        """
+        Drops the cached result of this component and of every ancestor, so
+        the next operation() recomputes only the path from here to the root.
+        The walk stops at the first ancestor that is already dirty: a clean
+        node always has clean descendants, so everything above it is dirty too.
+        """
+
+        self._cached = None
+        node = self.parent
+        while node is not None and node._cached is not None:
+            node._cached = None
+            node = node.parent
+
+    def __getstate__(self) -> dict:
+        # The node's own attributes, without the parent link (so pickling a
+        # subtree doesn't drag the rest of the tree along) or the cache.
+        state = self.__dict__.copy()
+        state.pop("_parent", None)
+        state.pop("_cached", None)
+        return state
+
+    def __reduce__(self):
+        """
+        Pickles (and copies) the whole subtree as a flat post-order list of
+        (class, state, number of children) entries, so neither pickling nor
+        unpickling recurses once per level. A node reached a second time, as
+        in a shared tree, is stored as the index of its first entry.
+        """
+
+        entries: List[object] = []
+        seen: Dict[int, int] = {}
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                seen[id(node)] = len(seen)
+                entries.append((type(node), node.__getstate__(), len(node.children)))
+            elif id(node) in seen:
+                entries.append(seen[id(node)])
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children))
+        return _rebuild_tree, (entries,)
+
     """
     In some cases, it would be beneficial to define the child-management
     operations right in the base Component class. This way, you won't need to
@@ -31,6 +95,14 @@ class Component(ABC):
     the leaf-level components.
     """
 
+    @property
+    def children(self) -> Sequence[Component]:
+        return ()
+
+    @property
+    def leaf_count(self) -> int:
+        return 0 if self.is_composite() else 1
+
     def add(self, component: Component) -> None:
         pass
 
@@ -77,7 +149,15 @@ class Composite(Component):
     """
 
     def __init__(self) -> None:
-        self._children: List[Component] = []
+        self._children: List[Optional[Component]] = []
+        # Order-statistics bookkeeping: the position of each child in
+        # _children (by identity), the number of leaves in this subtree, and a
+        # lazily rebuilt prefix sum of the children's leaf counts. Removed
+        # children leave a None tombstone until the list is next read.
+        self._positions: Dict[int, int] = {}
+        self._leaf_count = 0
+        self._prefix: Optional[List[int]] = None
+        self._tombstones = 0
 
     """
     A composite object can add or remove other components (both simple or
@@ -85,28 +165,724 @@ class Composite(Component):
     """
 
     def add(self, component: Component) -> None:
-        self._children.append(component)
-        component.parent = self
+        self.add_many((component,))
 
     def remove(self, component: Component) -> None:
-        self._children.remove(component)
-        component.parent = None
+        self.remove_many((component,))
+
+    def add_many(self, components: Iterable[Component]) -> None:
+        """
+        Adds several children while updating each ancestor's counters once.
+        """
+
+        delta = 0
+        for component in components:
+            self._positions[id(component)] = len(self._children)
+            self._children.append(component)
+            component.parent = self
+            delta += component.leaf_count
+        self._adjust_leaf_count(delta)
+        self.invalidate()
+
+    def remove_many(self, components: Iterable[Component]) -> None:
+        """
+        Removes several children in O(1) each (the child list is compacted on
+        its next read) while updating each ancestor's counters once.
+        """
+
+        components = list(components)
+        # The whole batch is checked up front so a bad entry leaves the
+        # composite untouched rather than half-updated.
+        seen = set()
+        for component in components:
+            if id(component) not in self._positions or id(component) in seen:
+                raise ValueError(f"{component!r} is not a child of this composite")
+            seen.add(id(component))
+
+        delta = 0
+        for component in components:
+            index = self._positions.pop(id(component))
+            self._children[index] = None
+            self._tombstones += 1
+            component.parent = None
+            delta -= component.leaf_count
+        self._adjust_leaf_count(delta)
+        self.invalidate()
+
+    def _adjust_leaf_count(self, delta: int) -> None:
+        self._prefix = None
+        if not delta:
+            return
+        node = self
+        while node is not None:
+            node._leaf_count += delta
+            node._prefix = None
+            node = node.parent
+
+    def _compact(self) -> None:
+        self._children = [child for child in self._children if child is not None]
+        self._positions = {id(child): index for index, child in enumerate(self._children)}
+        self._tombstones = 0
+
+    @property
+    def children(self) -> Sequence[Component]:
+        """
+        The live child list; use add() and remove() to change it.
+        """
+
+        if self._tombstones:
+            self._compact()
+        return self._children
+
+    @property
+    def leaf_count(self) -> int:
+        return self._leaf_count
+
+    def leaf_at(self, index: int) -> Component:
+        """
+        Returns the index-th leaf of this subtree in left-to-right order. Each
+        level is resolved by binary search over the children's cumulative leaf
+        counts, so after the first lookup following a change the cost is
+        O(depth * log(fanout)).
+        """
+
+        if not 0 <= index < self._leaf_count:
+            raise IndexError("leaf index out of range")
+        node: Component = self
+        while node.is_composite():
+            children = node.children
+            if node._prefix is None:
+                node._prefix = list(accumulate(child.leaf_count for child in children))
+            position = bisect_right(node._prefix, index)
+            if position:
+                index -= node._prefix[position - 1]
+            node = children[position]
+        return node
 
     def is_composite(self) -> bool:
         return True
 
+    def __getstate__(self) -> dict:
+        state = super().__getstate__()
+        for name in ("_children", "_positions", "_leaf_count", "_prefix", "_tombstones"):
+            state.pop(name, None)
+        return state
+
+    def _attach(self, children: List[Component]) -> None:
+        Composite.__init__(self)
+        self.add_many(children)
+
     def operation(self) -> str:
         """
         The Composite executes its primary logic in a particular way. It
         traverses recursively through all its children, collecting and summing
         their results. Since the composite's children pass these calls to their
         children and so forth, the whole object tree is traversed as a result.
+
+        The result is cached until the subtree changes, so repeated calls on an
+        unchanged tree don't traverse it again.
+        """
+
+        if self._cached is None:
+            results = []
+            for child in self.children:
+                results.append(child.operation())
+            self._cached = f"Branch({'+'.join(results)})"
+        return self._cached
+
+
+class FrozenComposite(Composite):
+    """
+    An immutable composite built by SharedTreeBuilder. Its children may be
+    shared with any number of other composites, so they don't point back to it
+    and the parent link of a frozen subtree stays None. Because nothing below
+    it can change, its cached operation() result never needs invalidating.
+    """
+
+    def __init__(self, children: Sequence[Component] = ()) -> None:
+        super().__init__()
+        for child in children:
+            if child.is_composite() and not isinstance(child, FrozenComposite):
+                raise TypeError(f"FrozenComposite can't hold the mutable {type(child).__name__} {child!r}")
+        self._children = list(children)
+        self._leaf_count = sum(child.leaf_count for child in self._children)
+
+    def add_many(self, components: Iterable[Component]) -> None:
+        raise TypeError("FrozenComposite is immutable")
+
+    def remove_many(self, components: Iterable[Component]) -> None:
+        raise TypeError("FrozenComposite is immutable")
+
+    def _attach(self, children: List[Component]) -> None:
+        FrozenComposite.__init__(self, children)
+
+
+class SharedTreeBuilder:
+    """
+    Builds trees by hash-consing: structurally identical subtrees are created
+    once and referenced wherever they occur, turning a repetitive tree into a
+    much smaller DAG. Since each unique subtree is a single FrozenComposite,
+    its operation() result is computed and cached only once as well.
+
+    Leaves are shared per class, so this is meant for leaves without their
+    own per-instance state.
+    """
+
+    def __init__(self) -> None:
+        self._leaves: Dict[type, Component] = {}
+        self._composites: Dict[tuple, FrozenComposite] = {}
+        self.hits = 0
+
+    def leaf(self, leaf_type: type = Leaf) -> Component:
+        if leaf_type not in self._leaves:
+            self._leaves[leaf_type] = leaf_type()
+        else:
+            self.hits += 1
+        return self._leaves[leaf_type]
+
+    def composite(self, *children: Component) -> FrozenComposite:
+        # Interned children are unique per structure, so identity stands for
+        # structure; anything else is interned first.
+        children = tuple(child if self._owns(child) else self.intern(child) for child in children)
+        key = tuple(id(child) for child in children)
+        node = self._composites.get(key)
+        if node is None:
+            node = self._composites[key] = FrozenComposite(children)
+        else:
+            self.hits += 1
+        return node
+
+    def _owns(self, component: Component) -> bool:
+        if isinstance(component, FrozenComposite):
+            return self._composites.get(tuple(id(child) for child in component._children)) is component
+        return self._leaves.get(type(component)) is component
+
+    def intern(self, component: Component) -> Component:
+        """
+        Returns the shared equivalent of an existing tree.
+        """
+
+        return fold(component, lambda leaf: self.leaf(type(leaf)),
+                    lambda _, children: self.composite(*children))
+
+    @property
+    def unique_nodes(self) -> int:
+        return len(self._leaves) + len(self._composites)
+
+
+def _rebuild_tree(entries: List[object]) -> Component:
+    # Inverse of Component.__reduce__: each entry's children are the last
+    # nodes on the stack. Nodes are created without calling __init__, so
+    # classes whose constructor takes arguments come back as well.
+    built: List[Component] = []
+    stack: List[Component] = []
+    for entry in entries:
+        if isinstance(entry, int):
+            stack.append(built[entry])
+            continue
+        node_type, state, child_count = entry
+        node = node_type.__new__(node_type)
+        node.__dict__.update(state)
+        if node.is_composite():
+            start = len(stack) - child_count
+            node._attach(stack[start:])
+            del stack[start:]
+        built.append(node)
+        stack.append(node)
+    return stack[0]
+
+
+def _importable_module(node_type: type) -> str:
+    module = node_type.__module__
+    if module == "__main__":
+        spec = getattr(sys.modules["__main__"], "__spec__", None)
+        if spec is not None and spec.name:
+            return spec.name
+    return module
+
+
+def _resolve_node_type(module: str, qualname: str) -> type:
+    try:
+        node_type = importlib.import_module(module)
+        for attribute in qualname.split("."):
+            node_type = getattr(node_type, attribute)
+    except (ImportError, AttributeError):
+        raise ValueError(f"cannot resolve node type {module}:{qualname}") from None
+    if not (isinstance(node_type, type) and issubclass(node_type, Component)):
+        raise ValueError(f"{module}:{qualname} is not a Component class")
+    return node_type
+
+
+class FlatTree:
+    """
+    A compact, array-backed form of a Component tree. Nodes are numbered in
+    pre-order and described by four parallel integer arrays: parent,
+    first_child, next_sibling (-1 where there is none) and kind, an index into
+    node_types holding the concrete class of each node. That is about 14
+    bytes per node instead of one Python object plus a child list.
+
+    Because of the pre-order numbering a parent always precedes its children
+    and every subtree occupies a contiguous id range, so aggregates like
+    subtree sizes or depths are single passes over the arrays.
+
+    Only the shape and the node classes are stored, so nodes must not carry
+    instance state of their own; from_component() raises TypeError for those.
+    Pickle such trees instead (see Component.__reduce__).
+    """
+
+    def __init__(self) -> None:
+        self.parent = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.kind = array("H")
+        self.node_types: List[type] = []
+        self.composite_kinds: List[bool] = []
+        self._mapping = None
+
+    @classmethod
+    def from_component(cls, component: Component) -> FlatTree:
+        tree = cls()
+        kinds: Dict[type, int] = {}
+        last_child = array("i")
+        stack = [(component, -1)]
+        while stack:
+            node, parent_id = stack.pop()
+            node_id = len(tree.parent)
+            # Shared subtrees are expanded here and come back from
+            # to_component() as ordinary, mutable composites.
+            node_type = Composite if isinstance(node, FrozenComposite) else type(node)
+            state = node.__getstate__()
+            if state:
+                raise TypeError(f"{node_type.__name__} node has instance state {sorted(state)} "
+                                f"that a FlatTree can't store")
+            if node_type not in kinds:
+                kinds[node_type] = len(tree.node_types)
+                tree.node_types.append(node_type)
+                tree.composite_kinds.append(node.is_composite())
+            tree.parent.append(parent_id)
+            tree.first_child.append(-1)
+            tree.next_sibling.append(-1)
+            tree.kind.append(kinds[node_type])
+            last_child.append(-1)
+            if parent_id >= 0:
+                if last_child[parent_id] < 0:
+                    tree.first_child[parent_id] = node_id
+                else:
+                    tree.next_sibling[last_child[parent_id]] = node_id
+                last_child[parent_id] = node_id
+            stack.extend((child, node_id) for child in reversed(node.children))
+        return tree
+
+    def to_component(self) -> Component:
+        """
+        Rebuilds the object tree. Node classes are instantiated without
+        arguments; since nodes with state are refused by from_component(),
+        that gives back an equal tree.
+        """
+
+        nodes = [self.node_types[kind]() for kind in self.kind]
+        # Subtrees are attached bottom-up (children have higher ids than their
+        # parent), so each add_many() runs on a node that has no parent yet.
+        for node_id in range(len(nodes) - 1, -1, -1):
+            if self.first_child[node_id] >= 0:
+                nodes[node_id].add_many([nodes[child] for child in self.children(node_id)])
+        return nodes[0]
+
+    _MAGIC = b"FLATTREE"
+    _HEADER = struct.Struct("<8sQQ")
+
+    def save(self, path: str) -> None:
         """
+        Writes the tree as a header, the class names of node_types and the
+        four arrays as raw little-endian integers, each starting 8-byte aligned.
+        Node classes have to be importable by their module name; classes
+        defined in a script run directly are saved under the name it would be
+        imported as when started with "python -m", if there is one.
+        """
+
+        names = "\n".join(f"{_importable_module(node_type)}:{node_type.__qualname__}:{int(composite)}"
+                          for node_type, composite in zip(self.node_types, self.composite_kinds)).encode("utf-8")
+        names += b"\0" * (-len(names) % 8)
+        columns = [array(column.typecode, column) for column in
+                   (self.parent, self.first_child, self.next_sibling, self.kind)]
+        if sys.byteorder == "big":
+            for column in columns:
+                column.byteswap()
+        with open(path, "wb") as file:
+            file.write(self._HEADER.pack(self._MAGIC, len(self), len(names)))
+            file.write(names)
+            for column in columns:
+                file.write(column.tobytes())
+                file.write(b"\0" * (-len(column) * column.itemsize % 8))
+
+    @classmethod
+    def open(cls, path: str) -> FlatTree:
+        """
+        Maps a file written by save() into memory. The arrays are replaced by
+        read-only views of the mapping, so nothing is decoded up front and
+        worker processes opening the same file share its pages (on big-endian
+        hosts the arrays are copied and byte-swapped instead). Call close()
+        when done. Only Component subclasses are accepted as node types.
+        """
+
+        with open(path, "rb") as file:
+            try:
+                mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"{path} is not a flat tree file") from None
+        views: List[memoryview] = []
+        try:
+            if len(mapping) < cls._HEADER.size:
+                raise ValueError(f"{path} is not a flat tree file")
+            magic, count, names_length = cls._HEADER.unpack_from(mapping)
+            if magic != cls._MAGIC:
+                raise ValueError(f"{path} is not a flat tree file")
+            layout = (("i", 4), ("i", 4), ("i", 4), ("H", 2))
+            offset = cls._HEADER.size + names_length
+            if offset + sum(count * size + (-count * size % 8) for _, size in layout) > len(mapping):
+                raise ValueError(f"{path} is truncated")
+            tree = cls()
+            names = bytes(mapping[cls._HEADER.size:offset]).rstrip(b"\0").decode("utf-8")
+            for name in names.split("\n") if names else ():
+                module, qualname, composite = name.split(":")
+                tree.node_types.append(_resolve_node_type(module, qualname))
+                tree.composite_kinds.append(composite == "1")
+            views.append(memoryview(mapping))
+            columns = []
+            for typecode, itemsize in layout:
+                columns.append(views[0][offset:offset + count * itemsize].cast(typecode))
+                views.append(columns[-1])
+                offset += count * itemsize + (-count * itemsize % 8)
+        except BaseException:
+            for view in reversed(views):
+                view.release()
+            mapping.close()
+            raise
+        if sys.byteorder == "big":
+            swapped = []
+            for column in columns:
+                swapped.append(array(column.format, column.tobytes()))
+                swapped[-1].byteswap()
+            for view in reversed(views):
+                view.release()
+            mapping.close()
+            tree.parent, tree.first_child, tree.next_sibling, tree.kind = swapped
+            return tree
+        tree.parent, tree.first_child, tree.next_sibling, tree.kind = columns
+        tree._mapping = (mapping, views[0])
+        return tree
+
+    def close(self) -> None:
+        mapping = self._mapping
+        if mapping is not None:
+            for column in (self.parent, self.first_child, self.next_sibling, self.kind):
+                column.release()
+            mapping[1].release()
+            mapping[0].close()
+            self._mapping = None
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def children(self, node_id: int) -> Iterator[int]:
+        child = self.first_child[node_id]
+        while child >= 0:
+            yield child
+            child = self.next_sibling[child]
+
+    def subtree_sizes(self) -> array:
+        sizes = array("i", [1]) * len(self)
+        parent = self.parent
+        for node_id in range(len(self) - 1, 0, -1):
+            sizes[parent[node_id]] += sizes[node_id]
+        return sizes
+
+    def depths(self) -> array:
+        depths = array("i", [0]) * len(self)
+        parent = self.parent
+        for node_id in range(1, len(self)):
+            depths[node_id] = depths[parent[node_id]] + 1
+        return depths
+
+    def leaf_count(self) -> int:
+        composite = self.composite_kinds
+        return sum(1 for kind in self.kind if not composite[kind])
+
+    def subtree_leaf_counts(self) -> array:
+        composite = self.composite_kinds
+        counts = array("i", (0 if composite[kind] else 1 for kind in self.kind))
+        parent = self.parent
+        for node_id in range(len(self) - 1, 0, -1):
+            counts[parent[node_id]] += counts[node_id]
+        return counts
+
+
+"""
+The traversal helpers below use an explicit stack or queue instead of Python
+recursion, so they work on trees of any depth and avoid a call frame per level.
+"""
+
+
+def iter_preorder(component: Component) -> Iterator[Component]:
+    stack = [component]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children))
+
+
+def iter_postorder(component: Component) -> Iterator[Component]:
+    stack = [(component, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded or not node.children:
+            yield node
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children))
+
+
+def iter_level_order(component: Component) -> Iterator[Component]:
+    queue = deque([component])
+    while queue:
+        node = queue.popleft()
+        yield node
+        queue.extend(node.children)
+
+
+def fold(component: Component, leaf: Callable[[Component], T],
+         combine: Callable[[Component, List[T]], T]) -> T:
+    """
+    Computes a bottom-up aggregate without recursion: leaf() is applied to
+    every leaf and combine() to every composite together with its children's
+    results in child order.
+    """
+
+    results: List[T] = []
+    stack = [(component, False)]
+    push, pop, emit = stack.append, stack.pop, results.append
+    while stack:
+        node, expanded = pop()
+        if expanded:
+            start = len(results) - len(node.children)
+            values = results[start:]
+            del results[start:]
+            emit(combine(node, values))
+        elif node.is_composite():
+            push((node, True))
+            stack.extend([(child, False) for child in reversed(node.children)])
+        else:
+            emit(leaf(node))
+    return results[0]
+
+
+def iterative_operation(component: Component) -> str:
+    """
+    Same result as component.operation(), computed without recursion. Cached
+    subtrees are reused and freshly computed composites are cached.
+    """
+
+    results: List[str] = []
+    stack = [(component, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not node.is_composite():
+            results.append(node.operation())
+        elif node._cached is not None:
+            results.append(node._cached)
+        elif expanded:
+            start = len(results) - len(node.children)
+            node._cached = f"Branch({'+'.join(results[start:])})"
+            del results[start:]
+            results.append(node._cached)
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children))
+    return results[0]
+
+
+def iter_operation(component: Component) -> Iterator[str]:
+    """
+    Yields the result of component.operation() in chunks. Every leaf result
+    and separator is produced exactly once, instead of being copied again into
+    each ancestor's string, so the total work is linear in the output size and
+    memory is bounded by the tree's depth. Cached subtrees are emitted whole.
+    """
+
+    stack: List[object] = [component]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            yield item
+        elif not item.is_composite():
+            yield item.operation()
+        elif item._cached is not None:
+            yield item._cached
+        else:
+            yield "Branch("
+            stack.append(")")
+            children = item.children
+            for index in range(len(children) - 1, -1, -1):
+                stack.append(children[index])
+                if index:
+                    stack.append("+")
+
+
+def write_operation(component: Component, sink: TextIO, buffer_size: int = 1 << 16) -> int:
+    """
+    Streams the rendering of component into a file-like sink, joining small
+    chunks into writes of about buffer_size characters. Returns the number of
+    characters written.
+    """
+
+    pending: List[str] = []
+    pending_size = written = 0
+    for chunk in iter_operation(component):
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= buffer_size:
+            sink.write("".join(pending))
+            written += pending_size
+            pending.clear()
+            pending_size = 0
+    if pending:
+        sink.write("".join(pending))
+        written += pending_size
+    return written
+
+
+def parallel_operation(component: Component, executor: Executor, threshold: int = 1000,
+                       workers: Optional[int] = None, tasks_per_worker: int = 4) -> str:
+    """
+    Same result as component.operation(), with independent subtrees evaluated
+    on an executor. The top of the tree is expanded level by level until there
+    are about tasks_per_worker * workers subtrees; each is submitted as one
+    task and the results are joined in child order. Trees smaller than
+    threshold nodes are evaluated serially, where the cost of dispatching
+    would outweigh the gain.
+
+    A ThreadPoolExecutor helps when leaves release the GIL (I/O, native code);
+    CPU-bound Python leaves need a ProcessPoolExecutor, in which case the
+    subtrees are pickled with their leaves' state and their results are not
+    cached in this process.
+    """
+
+    if (not component.is_composite() or component._cached is not None
+            or sum(1 for _ in islice(iter_preorder(component), threshold)) < threshold):
+        return iterative_operation(component)
+
+    target = tasks_per_worker * (workers or os.cpu_count() or 1)
+    frontier = [component]
+    expanded = set()
+    while len(frontier) < target:
+        next_frontier = []
+        for node in frontier:
+            if node.is_composite() and node._cached is None and node.children:
+                expanded.add(id(node))
+                next_frontier.extend(node.children)
+            else:
+                next_frontier.append(node)
+        if len(next_frontier) == len(frontier):
+            break
+        frontier = next_frontier
+
+    futures: Dict[int, Future] = {}
+    for node in frontier:
+        if not (node.is_composite() and node._cached is not None):
+            futures[id(node)] = executor.submit(iterative_operation, node)
+
+    results: List[str] = []
+    stack = [(component, False)]
+    while stack:
+        node, assembled = stack.pop()
+        if id(node) in futures:
+            # Not cached here: when the subtree ran in another process its
+            # descendants are still dirty in this one, and a clean node must
+            # never sit above dirty ones (see Component.invalidate). In-process
+            # executors have already cached it through iterative_operation.
+            results.append(futures[id(node)].result())
+        elif id(node) not in expanded:
+            results.append(node.operation())
+        elif assembled:
+            start = len(results) - len(node.children)
+            value = f"Branch({'+'.join(results[start:])})"
+            if all(not child.is_composite() or child._cached is not None for child in node.children):
+                node._cached = value
+            del results[start:]
+            results.append(value)
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children))
+    return results[0]
+
+
+def build_balanced(depth: int, fanout: int = 2, leaf: Callable[[], Component] = Leaf) -> Component:
+    if depth == 0:
+        return leaf()
+    root = Composite()
+    level = [root]
+    for current in range(1, depth + 1):
+        next_level = []
+        for parent in level:
+            for _ in range(fanout):
+                child = leaf() if current == depth else Composite()
+                parent.add(child)
+                next_level.append(child)
+        level = next_level
+    return root
+
+
+def build_degenerate(depth: int) -> Component:
+    """
+    A chain of composites, each holding a leaf and the next composite.
+    """
+
+    # Built bottom-up so that every add() happens on a detached root and the
+    # counter updates don't have to walk the whole chain each time.
+    node = Composite()
+    node.add(Leaf())
+    for _ in range(depth - 1):
+        parent = Composite()
+        parent.add_many((Leaf(), node))
+        node = parent
+    return node
+
+
+def benchmark_traversal(number: int = 3) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Times a leaf count computed with plain recursion against the same count
+    computed with fold(), plus a full pre-order walk, on balanced, degenerate
+    and 100k-level trees. Returns milliseconds per run; recursion is None where
+    it hits the recursion limit.
+    """
 
-        results = []
-        for child in self._children:
-            results.append(child.operation())
-        return f"Branch({'+'.join(results)})"
+    def count_recursive(node: Component) -> int:
+        if not node.is_composite():
+            return 1
+        return sum(count_recursive(child) for child in node.children)
+
+    def count_fold(node: Component) -> int:
+        return fold(node, lambda _: 1, lambda _, values: sum(values))
+
+    def timed(function, tree) -> Optional[float]:
+        try:
+            return timeit.timeit(lambda: function(tree), number=number) / number * 1e3
+        except RecursionError:
+            return None
+
+    trees = {
+        "balanced (2^16 leaves)": build_balanced(16),
+        f"degenerate ({sys.getrecursionlimit() // 4} levels)": build_degenerate(sys.getrecursionlimit() // 4),
+        "degenerate (100k levels)": build_degenerate(100_000),
+    }
+    return {
+        name: {
+            "recursive": timed(count_recursive, tree),
+            "fold": timed(count_fold, tree),
+            "preorder": timed(lambda t: sum(1 for _ in iter_preorder(t)), tree),
+        }
+        for name, tree in trees.items()
+    }
 
 
 def client_code(component: Component) -> None:
@@ -130,6 +906,16 @@ def client_code2(component1: Component, component2: Component) -> None:
     print(f"RESULT: {component1.operation()}", end="")
 
 
+class ExpensiveLeaf(Leaf):
+    """
+    A leaf standing in for real computation, used by the parallel demo below.
+    """
+
+    def operation(self) -> str:
+        sum(i * i for i in range(20_000))
+        return "Leaf"
+
+
 if __name__ == "__main__":
     # This way the client code can support the simple leaf components...
     simple = Leaf()
@@ -156,3 +942,65 @@ if __name__ == "__main__":
 
     print("Client: I don't need to check the components classes even when managing the tree:")
     client_code2(tree, simple)
+    print("\n")
+
+    print("Client: Walking the tree without recursion:")
+    print(" ".join(type(node).__name__ for node in iter_preorder(tree)))
+    print(f"RESULT: {iterative_operation(build_degenerate(5_000))[:40]}...")
+    print("\n")
+
+    print("Client: Streaming a 100k-level tree into a sink:")
+    sink = io.StringIO()
+    written = write_operation(build_degenerate(100_000), sink)
+    print(f"RESULT: {written} characters, starting with {sink.getvalue()[:40]}...")
+    print("\n")
+
+    print("Client: The same tree as flat arrays:")
+    flat = FlatTree.from_component(tree)
+    print(f"RESULT: {len(flat)} nodes, {flat.leaf_count()} leaves, max depth {max(flat.depths())}, "
+          f"round trip {flat.to_component().operation() == tree.operation()}")
+    print("\n")
+
+    print("Client: Saving the flat tree and mapping it back in:")
+    with tempfile.TemporaryDirectory() as scratch:
+        snapshot_path = os.path.join(scratch, "tree.flat")
+        FlatTree.from_component(build_balanced(12)).save(snapshot_path)
+        start = time.perf_counter()
+        mapped = FlatTree.open(snapshot_path)
+        opened = time.perf_counter() - start
+        print(f"RESULT: {len(mapped)} nodes opened in {opened * 1e3:.2f}ms, {mapped.leaf_count()} leaves, "
+              f"max depth {max(mapped.depths())}, "
+              f"round trip {mapped.to_component().operation() == build_balanced(12).operation()}")
+        mapped.close()
+    print("\n")
+
+    print("Client: Paging through leaves by position:")
+    big_tree = build_balanced(9, fanout=3)
+    big_tree.children[0].remove_many(list(big_tree.children[0].children[:2]))
+    print(f"RESULT: {big_tree.leaf_count} leaves, leaf #10000 is a {type(big_tree.leaf_at(10_000)).__name__}")
+    print("\n")
+
+    print("Client: Sharing identical subtrees:")
+    builder = SharedTreeBuilder()
+    shared = builder.intern(big_tree)
+    print(f"RESULT: {sum(1 for _ in iter_preorder(big_tree))} nodes stored as {builder.unique_nodes}, "
+          f"same result {shared.operation() == big_tree.operation()}")
+    print("\n")
+
+    print("Client: Evaluating expensive leaves on a process pool:")
+    expensive_tree = build_balanced(8, leaf=ExpensiveLeaf)
+    start = time.perf_counter()
+    serial = iterative_operation(build_balanced(8, leaf=ExpensiveLeaf))
+    serial_time = time.perf_counter() - start
+    with ProcessPoolExecutor() as executor:
+        start = time.perf_counter()
+        parallel = parallel_operation(expensive_tree, executor, threshold=100)
+        parallel_time = time.perf_counter() - start
+    print(f"RESULT: serial {serial_time:.2f}s, parallel {parallel_time:.2f}s on {os.cpu_count()} CPU(s), "
+          f"same result {serial == parallel}")
+    print("\n")
+
+    print("Client: Leaf count, ms per run:")
+    for name, timings in benchmark_traversal().items():
+        print(f"{name:28}" + "  ".join(f"{method}={'RecursionError' if ms is None else f'{ms:.1f}'}"
+                                       for method, ms in timings.items()))
@@ -22,10 +22,22 @@
 """
 
 
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
 # Component interface
 class FileSystemComponent:
     def __init__(self, name):
         self.name = name
+        self.parent = None
+        self.file_count = 0
+        self.total_size = 0
 
     def operation(self):
         pass
@@ -39,37 +51,540 @@ class FileSystemComponent:
     def get_child(self, index):
         pass
 
+    @property
+    def path(self):
+        names = []
+        node = self
+        while node is not None:
+            names.append(node.name)
+            node = node.parent
+        return "/".join(reversed(names))
+
+    def root(self):
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        return node
+
+    def _propagate(self, files, size):
+        node = self
+        while node is not None:
+            node.file_count += files
+            node.total_size += size
+            node = node.parent
+
 
 # Leaf: File
 class File(FileSystemComponent):
+    def __init__(self, name, size=0):
+        super().__init__(name)
+        self.file_count = 1
+        self.total_size = size
+
+    @property
+    def size(self):
+        return self.total_size
+
+    def resize(self, size):
+        delta = size - self.total_size
+        self.total_size = size
+        if self.parent is not None:
+            self.parent._propagate(0, delta)
+
     def operation(self):
         print(f"File: {self.name}")
 
 
 # Composite: Directory
 class Directory(FileSystemComponent):
+    """
+    Every directory keeps the number of files and bytes below it up to date as
+    children are added and removed, and the root of a tree keeps an index from
+    full path (e.g. "Documents/Pictures/file3.txt") to node, so lookups don't
+    walk the children lists.
+    """
+
     def __init__(self, name):
         super().__init__(name)
         self.children = []
+        self._by_name = {}
+        self._index = {name: self}
 
     def operation(self):
         print(f"Directory: {self.name}")
 
     def add(self, component):
+        if component.name in self._by_name:
+            raise ValueError(f"{self.path} already contains {component.name!r}")
+        if component.parent is not None:
+            component.parent.remove(component)
         self.children.append(component)
+        self._by_name[component.name] = component
+        component.parent = self
+        if isinstance(component, Directory):
+            component._index = None
+        self._propagate(component.file_count, component.total_size)
+        index = self.root()._index
+        for path, node in _walk(component, self.path):
+            index[path] = node
 
     def remove(self, component):
+        if self._by_name.get(component.name) is not component:
+            raise ValueError(f"{component.name!r} is not in {self.path}")
+        index = self.root()._index
+        for path, _ in _walk(component, self.path):
+            del index[path]
         self.children.remove(component)
+        del self._by_name[component.name]
+        component.parent = None
+        self._propagate(-component.file_count, -component.total_size)
+        if isinstance(component, Directory):
+            component._index = dict(_walk(component, ""))
 
     def get_child(self, index):
         return self.children[index]
 
+    def _entries(self):
+        return self.children
+
+    def get(self, name):
+        return self._by_name.get(name)
+
+    def lookup(self, path):
+        """
+        Finds a node anywhere in this directory's tree by its full path.
+        """
+
+        return self.root()._index.get(path)
+
+
+def _walk(component, prefix):
+    # Yields (path, node) for a subtree without recursion; prefix is the path
+    # of the directory the subtree hangs from.
+    stack = [(component, f"{prefix}/{component.name}" if prefix else component.name)]
+    while stack:
+        node, path = stack.pop()
+        yield path, node
+        if isinstance(node, Directory):
+            # _entries() gives the children already in memory without making a
+            # lazy directory list itself.
+            for child in node._entries():
+                stack.append((child, f"{path}/{child.name}"))
+
+
+def _lookup_by_names(root, path):
+    # Resolves a path one name at a time through get(), so directories that
+    # load or decode on demand only do so along the path.
+    names = path.split("/")
+    if names[0] != root.name:
+        return None
+    node = root
+    for name in names[1:]:
+        if not isinstance(node, Directory):
+            return None
+        node = node.get(name)
+        if node is None:
+            return None
+    return node
+
+
+# Memory budget shared by all lazy directories of a tree
+class LoadBudget:
+    """
+    Tracks how many entries the loaded LazyDirectory objects hold, in least
+    recently used order. When the total goes over max_entries, the directories
+    touched longest ago drop their children again (they are re-listed if
+    visited later). A directory and its ancestors are touched together, so a
+    directory in use never loses the path above it.
+    """
+
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self.loaded_entries = 0
+        self.evictions = 0
+        self._loaded = OrderedDict()
+
+    def touch(self, directory):
+        node = directory
+        while node is not None:
+            if node in self._loaded:
+                self._loaded.move_to_end(node)
+            node = node.parent
+
+    def admit(self, directory, entries):
+        self._loaded[directory] = entries
+        self.loaded_entries += entries
+        self.touch(directory)
+        protected = set()
+        node = directory
+        while node is not None:
+            protected.add(node)
+            node = node.parent
+        for victim in list(self._loaded):
+            if self.loaded_entries <= self.max_entries:
+                break
+            if victim in self._loaded and victim not in protected:
+                victim.unload()
+                self.evictions += 1
+
+    def forget(self, directory):
+        self.loaded_entries -= self._loaded.pop(directory, 0)
+
+
+# Composite: Directory mirroring a real directory, listed on first access
+class LazyDirectory(Directory):
+    """
+    Mirrors a directory on disk. Its children are listed with os.scandir the
+    first time children or get_child is used, and may be dropped again when
+    the shared LoadBudget runs out, so only the visited parts of a large tree
+    take up memory. file_count and total_size cover the loaded part only;
+    add(), remove(), get() and lookup() list the directories they pass
+    through as needed.
+    """
+
+    def __init__(self, name, real_path, budget=None):
+        self._children = []
+        self._loaded = False
+        super().__init__(name)
+        self.real_path = real_path
+        self.budget = budget if budget is not None else LoadBudget()
+
+    @classmethod
+    def from_path(cls, real_path, budget=None):
+        return cls(os.path.basename(os.path.normpath(real_path)) or real_path, real_path, budget)
+
+    @property
+    def children(self):
+        if not self._loaded:
+            self._load()
+        else:
+            self.budget.touch(self)
+        return self._children
+
+    @children.setter
+    def children(self, children):
+        self._children = children
+
+    @property
+    def is_loaded(self):
+        return self._loaded
+
+    def add(self, component):
+        # Listed first so the name check sees the entries on disk.
+        if not self._loaded:
+            self._load()
+        super().add(component)
+
+    def remove(self, component):
+        if not self._loaded:
+            self._load()
+        super().remove(component)
+
+    def get(self, name):
+        self.children
+        return super().get(name)
+
+    def lookup(self, path):
+        return _lookup_by_names(self.root(), path)
+
+    def _entries(self):
+        return self._children
+
+    def _load(self):
+        with os.scandir(self.real_path) as scan:
+            entries = sorted(scan, key=lambda entry: entry.name)
+        self._loaded = True
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                self.add(LazyDirectory(entry.name, entry.path, self.budget))
+            else:
+                self.add(File(entry.name, entry.stat(follow_symlinks=False).st_size))
+        self.budget.admit(self, len(entries))
+
+    def unload(self):
+        """
+        Drops everything loaded below this directory.
+        """
+
+        if not self._loaded:
+            return
+        index = self.root()._index
+        prefix = self.parent.path if self.parent is not None else ""
+        for path, node in _walk(self, prefix):
+            if node is self:
+                continue
+            index.pop(path, None)
+            if isinstance(node, LazyDirectory):
+                self.budget.forget(node)
+        for node in list(self._children):
+            # Detached children start over if someone still holds them.
+            node.parent = None
+            if isinstance(node, LazyDirectory):
+                node._reset()
+        self.budget.forget(self)
+        self._propagate(-self.file_count, -self.total_size)
+        self._children = []
+        self._by_name = {}
+        self._loaded = False
+
+    def _reset(self):
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            stack.extend(child for child in node._children if isinstance(child, LazyDirectory))
+            node._children = []
+            node._by_name = {}
+            node._index = {node.name: node}
+            node._loaded = False
+            node.file_count = 0
+            node.total_size = 0
+
+
+def _list_directory(real_path):
+    # Runs on a worker thread: all the blocking I/O for one directory.
+    with os.scandir(real_path) as scan:
+        entries = sorted(scan, key=lambda entry: entry.name)
+    return [(entry.name, entry.path, entry.is_dir(follow_symlinks=False),
+             0 if entry.is_dir(follow_symlinks=False) else entry.stat(follow_symlinks=False).st_size)
+            for entry in entries]
+
+
+class ScanStats:
+    def __init__(self):
+        self.directories = 0
+        self.files = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def files_per_second(self):
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (f"ScanStats(directories={self.directories}, files={self.files}, errors={self.errors}, "
+                f"elapsed={self.elapsed:.3f}s, files_per_second={self.files_per_second:.0f})")
+
+
+# Builds a Directory/File tree from disk, listing directories concurrently
+class ParallelScanner:
+    """
+    Directory listings (the I/O) run on a pool of worker threads while the
+    calling thread assembles the tree, so Directory objects are never touched
+    concurrently. Each directory gets its children in name order however the
+    listings complete, which keeps the result deterministic. Directories that
+    can't be read are left empty and counted in ScanStats.errors. The progress
+    callback receives the running ScanStats at most every progress_interval
+    seconds.
+    """
+
+    def __init__(self, workers=8, progress=None, progress_interval=1.0):
+        self.workers = workers
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.stats = ScanStats()
+
+    def scan(self, real_path):
+        self.stats = stats = ScanStats()
+        root = Directory(os.path.basename(os.path.normpath(real_path)) or real_path)
+        last_report = stats.started
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {pool.submit(_list_directory, real_path): root}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    directory = pending.pop(future)
+                    try:
+                        entries = future.result()
+                    except OSError:
+                        # Like os.walk, an unreadable directory is kept (empty)
+                        # and the scan goes on.
+                        stats.errors += 1
+                        continue
+                    for name, path, is_dir, size in entries:
+                        if is_dir:
+                            child = Directory(name)
+                            pending[pool.submit(_list_directory, path)] = child
+                        else:
+                            child = File(name, size)
+                            stats.files += 1
+                        directory.add(child)
+                    stats.directories += 1
+                now = time.perf_counter()
+                stats.elapsed = now - stats.started
+                if self.progress is not None and now - last_report >= self.progress_interval:
+                    self.progress(stats)
+                    last_report = now
+        stats.elapsed = time.perf_counter() - stats.started
+        if self.progress is not None:
+            self.progress(stats)
+        return root
+
+
+def make_test_tree(real_path, depth=3, fanout=4, files_per_directory=10):
+    """
+    Generates a directory hierarchy on disk for trying out the scanner.
+    """
+
+    os.makedirs(real_path, exist_ok=True)
+    for index in range(files_per_directory):
+        with open(os.path.join(real_path, f"file{index}.txt"), "w") as file:
+            file.write("x" * index)
+    if depth > 0:
+        for index in range(fanout):
+            make_test_tree(os.path.join(real_path, f"dir{index}"), depth - 1, fanout, files_per_directory)
+
+
+"""
+Snapshot format (little endian):
+
+    header   magic, node count, offset of the string table
+    nodes    one fixed-size record per node in breadth-first order: kind,
+             name offset and length in the string table, total size, file
+             count, id of the first child and number of children
+    strings  the UTF-8 encoded names, back to back
+
+Breadth-first numbering puts the children of every directory at consecutive
+ids, so a directory only needs its first child id and child count.
+"""
+
+SNAPSHOT_MAGIC = b"FSSNAP01"
+SNAPSHOT_HEADER = struct.Struct("<8sQQ")
+SNAPSHOT_NODE = struct.Struct("<BIIQQII")
+SNAPSHOT_FILE, SNAPSHOT_DIRECTORY = 0, 1
+
+
+def save_snapshot(component, path):
+    """
+    Writes the tree under component to path. Lazy directories contribute
+    what they currently have loaded; mapped directories are saved in full.
+    """
+
+    nodes = [component]
+    records = []
+    strings = bytearray()
+    index = 0
+    while index < len(nodes):
+        node = nodes[index]
+        name = node.name.encode("utf-8")
+        if isinstance(node, Directory):
+            # Mapped directories carry totals for children that may not be
+            # decoded yet, so those are decoded to keep the two consistent.
+            children = node.children if isinstance(node, MappedDirectory) else node._entries()
+            record = (SNAPSHOT_DIRECTORY, len(strings), len(name), node.total_size, node.file_count,
+                      len(nodes), len(children))
+            nodes.extend(children)
+        else:
+            record = (SNAPSHOT_FILE, len(strings), len(name), node.total_size, 1, 0, 0)
+        records.append(record)
+        strings += name
+        index += 1
+
+    strings_offset = SNAPSHOT_HEADER.size + SNAPSHOT_NODE.size * len(records)
+    with open(path, "wb") as file:
+        file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(records), strings_offset))
+        file.writelines(SNAPSHOT_NODE.pack(*record) for record in records)
+        file.write(strings)
+
+
+class Snapshot:
+    """
+    A snapshot file mapped into memory. Nodes are decoded only when they are
+    visited, so opening even a very large snapshot is immediate, and processes
+    mapping the same file share its pages.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.node_count, self._strings_offset = SNAPSHOT_HEADER.unpack_from(self._map)
+        if magic != SNAPSHOT_MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a file system snapshot")
+
+    def root(self):
+        return self._decode(0)
+
+    def _decode(self, node_id):
+        kind, name_offset, name_length, size, file_count, first_child, child_count = SNAPSHOT_NODE.unpack_from(
+            self._map, SNAPSHOT_HEADER.size + node_id * SNAPSHOT_NODE.size)
+        start = self._strings_offset + name_offset
+        name = self._map[start:start + name_length].decode("utf-8")
+        if kind == SNAPSHOT_FILE:
+            return File(name, size)
+        return MappedDirectory(self, name, size, file_count, first_child, child_count)
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Composite: Directory read from a Snapshot, decoded on first access
+class MappedDirectory(Directory):
+    """
+    file_count and total_size come straight from the snapshot, so they are
+    right before any child has been decoded. lookup() resolves a path by
+    decoding just the directories along it.
+    """
+
+    def __init__(self, snapshot, name, total_size, file_count, first_child, child_count):
+        super().__init__(name)
+        self._children = None
+        self._snapshot = snapshot
+        self._first_child = first_child
+        self._child_count = child_count
+        self.file_count = file_count
+        self.total_size = total_size
+
+    @property
+    def children(self):
+        if self._children is None:
+            self._children = []
+            index = self.root()._index
+            path = self.path
+            for node_id in range(self._first_child, self._first_child + self._child_count):
+                child = self._snapshot._decode(node_id)
+                child.parent = self
+                self._children.append(child)
+                self._by_name[child.name] = child
+                # Decoded nodes join the path index like added ones, so the
+                # inherited add() and remove() keep it consistent.
+                index[f"{path}/{child.name}"] = child
+        return self._children
+
+    @children.setter
+    def children(self, children):
+        self._children = children
+
+    def _entries(self):
+        return self._children or []
+
+    def add(self, component):
+        # Decoded first so the name check sees the snapshot's entries.
+        self.children
+        super().add(component)
+
+    def remove(self, component):
+        self.children
+        super().remove(component)
+
+    def get(self, name):
+        self.children
+        return super().get(name)
+
+    def lookup(self, path):
+        return _lookup_by_names(self.root(), path)
 
 if __name__ == "__main__":
     # Create files
-    file1 = File("file1.txt")
-    file2 = File("file2.txt")
-    file3 = File("file3.txt")
+    file1 = File("file1.txt", 1200)
+    file2 = File("file2.txt", 800)
+    file3 = File("file3.txt", 2048)
 
     # Create directories
     dir1 = Directory("Documents")
@@ -87,5 +602,35 @@ if __name__ == "__main__":
 
     # Print the structure
     dir1.operation()
-    for child in dir1.get_child(0):
+    for child in dir1.children:
         child.operation()
+
+    # Look up by path and read the aggregates without walking the tree
+    print(dir1.lookup("Documents/Pictures/file3.txt").path)
+    print(f"Documents: {dir1.file_count} files, {dir1.total_size} bytes")
+    dir1.remove(dir2)
+    print(f"Documents: {dir1.file_count} files, {dir1.total_size} bytes")
+
+    # Mirror a real directory, listing entries only where we look
+    here = LazyDirectory.from_path(os.path.dirname(os.path.abspath(__file__)), LoadBudget(max_entries=1000))
+    print(f"{here.name}: loaded={here.is_loaded}")
+    print(f"{here.name}: {len(here.children)} entries, {here.file_count} files, {here.total_size} bytes, "
+          f"loaded={here.is_loaded}")
+
+    # Scan a generated tree with one and with eight worker threads
+    with tempfile.TemporaryDirectory() as scratch:
+        make_test_tree(os.path.join(scratch, "tree"), depth=4, fanout=4, files_per_directory=20)
+        for workers in (1, 8):
+            scanner = ParallelScanner(workers=workers)
+            tree = scanner.scan(os.path.join(scratch, "tree"))
+            print(f"workers={workers}: {tree.file_count} files, {tree.total_size} bytes, {scanner.stats}")
+
+        # Save the scanned tree and reopen it through mmap
+        snapshot_path = os.path.join(scratch, "tree.snapshot")
+        save_snapshot(tree, snapshot_path)
+        start = time.perf_counter()
+        with Snapshot(snapshot_path) as snapshot:
+            mapped = snapshot.root()
+            print(f"Snapshot of {snapshot.node_count} nodes ({os.path.getsize(snapshot_path)} bytes) opened in "
+                  f"{(time.perf_counter() - start) * 1e3:.2f}ms: {mapped.file_count} files, {mapped.total_size} bytes")
+            print(mapped.lookup("tree/dir3/dir2/file7.txt").path)
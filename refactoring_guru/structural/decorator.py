@@ -18,7 +18,67 @@ inheritance approach.
 """
 
 
+import hashlib
+import math
+import sys
+import threading
+import time
+import timeit
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Message encoded once and shared by every channel
+class MessageEnvelope:
+    """
+    Serializes the payload a single time into an immutable bytes buffer. Every
+    channel reads the body through a read-only memoryview and puts its own
+    header in front of it as a separate buffer, so the body is never copied or
+    re-encoded per channel.
+    """
+
+    __slots__ = ("body", "_text")
+
+    def __init__(self, message: str, encoding: str = "utf-8"):
+        self.body = memoryview(message.encode(encoding)).toreadonly()
+        self._text = message
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def frame(self, header: bytes) -> Tuple[bytes, memoryview, bytes]:
+        return header, self.body, b"\n"
+
+    def chunks(self, size: int) -> Iterable[memoryview]:
+        """
+        Zero-copy slices of the body for channels with a size limit per message.
+        """
+
+        for start in range(0, len(self.body), size):
+            yield self.body[start:start + size]
+
+    def __len__(self):
+        return len(self.body)
+
+
+def write_frame(parts: Iterable, out=None) -> None:
+    """
+    Writes the buffers of a frame one after another (like writev) instead of
+    joining them into a new string. out is a binary sink; by default the
+    frame goes to the binary buffer of sys.stdout, or is decoded and printed
+    when stdout is a text-only stream (e.g. under redirect_stdout).
+    """
+
+    if out is None:
+        out = getattr(sys.stdout, "buffer", None)
+        if out is None:
+            print("".join(bytes(part).decode("utf-8") for part in parts), end="")
+            return
+        sys.stdout.flush()
+    out.writelines(parts)
+    out.flush()
 
 
 # Component Interface
@@ -27,12 +87,26 @@ class Notifier(ABC):
     def send(self, message: str):
         pass
 
+    def send_many(self, messages: Iterable[str]):
+        for message in messages:
+            self.send(message)
+
+    def send_envelope(self, envelope: MessageEnvelope):
+        self.send(envelope.text)
+
 
 # Concrete Component
 class BasicNotifier(Notifier):
     def send(self, message: str):
         print(f"Sending basic notification: {message}")
 
+    def send_many(self, messages: Iterable[str]):
+        messages = list(messages)
+        print(f"Sending {len(messages)} basic notifications: {messages}")
+
+    def send_envelope(self, envelope: MessageEnvelope):
+        write_frame(envelope.frame(b"Sending basic notification: "))
+
 
 # Base Decorator
 class NotifierDecorator(Notifier):
@@ -42,6 +116,29 @@ class NotifierDecorator(Notifier):
     def send(self, message: str):
         self._notifier.send(message)
 
+    def send_many(self, messages: Iterable[str]):
+        # A subclass that customizes send() but not send_many() would lose its
+        # behaviour if the batch were just forwarded, so it gets one send() per
+        # message instead.
+        if type(self).send is not NotifierDecorator.send:
+            super().send_many(messages)
+        else:
+            self._notifier.send_many(messages)
+
+    def send_envelope(self, envelope: MessageEnvelope):
+        if type(self).send is not NotifierDecorator.send:
+            self.send(envelope.text)
+        else:
+            self._notifier.send_envelope(envelope)
+
+    def channel_sender(self) -> Optional[Callable[[str], None]]:
+        """
+        Returns the callable delivering this layer's own channel, or None if
+        the layer only forwards. Used by flatten() to unroll a stack.
+        """
+
+        return None
+
 
 # Concrete Decorator for Email Notifications
 class EmailNotifier(NotifierDecorator):
@@ -49,9 +146,27 @@ class EmailNotifier(NotifierDecorator):
         super().send(message)
         self.send_email(message)
 
+    def send_many(self, messages: Iterable[str]):
+        messages = list(messages)
+        self._notifier.send_many(messages)
+        self.send_email_batch(messages)
+
+    def send_envelope(self, envelope: MessageEnvelope):
+        self._notifier.send_envelope(envelope)
+        self.send_email_envelope(envelope)
+
+    def channel_sender(self):
+        return self.send_email
+
     def send_email(self, message: str):
         print(f"Sending email notification: {message}")
 
+    def send_email_batch(self, messages: List[str]):
+        print(f"Sending {len(messages)} email notifications: {messages}")
+
+    def send_email_envelope(self, envelope: MessageEnvelope):
+        write_frame(envelope.frame(b"Sending email notification: "))
+
 
 # Concrete Decorator for SMS Notifications
 class SMSNotifier(NotifierDecorator):
@@ -59,9 +174,27 @@ class SMSNotifier(NotifierDecorator):
         super().send(message)
         self.send_sms(message)
 
+    def send_many(self, messages: Iterable[str]):
+        messages = list(messages)
+        self._notifier.send_many(messages)
+        self.send_sms_batch(messages)
+
+    def send_envelope(self, envelope: MessageEnvelope):
+        self._notifier.send_envelope(envelope)
+        self.send_sms_envelope(envelope)
+
+    def channel_sender(self):
+        return self.send_sms
+
     def send_sms(self, message: str):
         print(f"Sending SMS notification: {message}")
 
+    def send_sms_batch(self, messages: List[str]):
+        print(f"Sending {len(messages)} SMS notifications: {messages}")
+
+    def send_sms_envelope(self, envelope: MessageEnvelope):
+        write_frame(envelope.frame(b"Sending SMS notification: "))
+
 
 # Concrete Decorator for Slack Notifications
 class SlackNotifier(NotifierDecorator):
@@ -69,9 +202,433 @@ class SlackNotifier(NotifierDecorator):
         super().send(message)
         self.send_slack(message)
 
+    def send_many(self, messages: Iterable[str]):
+        messages = list(messages)
+        self._notifier.send_many(messages)
+        self.send_slack_batch(messages)
+
+    def send_envelope(self, envelope: MessageEnvelope):
+        self._notifier.send_envelope(envelope)
+        self.send_slack_envelope(envelope)
+
+    def channel_sender(self):
+        return self.send_slack
+
     def send_slack(self, message: str):
         print(f"Sending Slack notification: {message}")
 
+    def send_slack_batch(self, messages: List[str]):
+        print(f"Sending {len(messages)} Slack notifications: {messages}")
+
+    def send_slack_envelope(self, envelope: MessageEnvelope):
+        write_frame(envelope.frame(b"Sending Slack notification: "))
+
+
+# Decorator buffering messages and delivering them in batches
+class BufferedNotifier(NotifierDecorator):
+    """
+    Accumulates messages and hands them to the wrapped notifier's send_many()
+    once max_batch_size messages are buffered or the oldest one has waited
+    max_delay seconds, whichever comes first. Call flush() or close() to
+    deliver what is left.
+    """
+
+    def __init__(self, notifier: Notifier, max_batch_size: int = 100, max_delay: Optional[float] = 1.0):
+        super().__init__(notifier)
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        self._max_batch_size = max_batch_size
+        self._max_delay = max_delay
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def send(self, message: str):
+        with self._lock:
+            self._buffer.append(message)
+            if len(self._buffer) < self._max_batch_size:
+                if self._timer is None and self._max_delay is not None:
+                    self._timer = threading.Timer(self._max_delay, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def send_many(self, messages: Iterable[str]):
+        for message in messages:
+            self.send(message)
+
+    def send_envelope(self, envelope: MessageEnvelope):
+        self.send(envelope.text)
+
+    def flush(self):
+        # Taking a batch and delivering it happen under one send lock, so
+        # batches from timer and size-triggered flushes can't overtake each
+        # other. _lock only guards the buffer, so send() never waits on I/O.
+        with self._send_lock:
+            with self._lock:
+                batch = self._take()
+            if batch:
+                self._notifier.send_many(batch)
+
+    def _take(self) -> List[str]:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._buffer = self._buffer, []
+        return batch
+
+    def close(self):
+        self.flush()
+
+
+# Fixed-size probabilistic set used by DeduplicatingNotifier
+class BloomFilter:
+    """
+    A bit array sized for `capacity` items at the given false-positive rate.
+    Memory is fixed at construction; inserting more items than planned only
+    raises the false-positive rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be in (0, 1)")
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: bytes):
+        # Double hashing: k positions derived from two 64-bit halves of one digest.
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: bytes) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: bytes) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def clear(self) -> None:
+        self._bits = bytearray(len(self._bits))
+
+
+# Decorator dropping messages already seen within a sliding time window
+class DeduplicatingNotifier(NotifierDecorator):
+    """
+    Keeps a ring of Bloom filters, each covering window / generations seconds.
+    A message seen in any of them is suppressed; otherwise it is recorded in
+    the newest filter and passed on. When the newest filter gets older than its
+    slice of the window, the oldest one is cleared and reused, so memory stays
+    flat however many distinct messages arrive. Duplicates older than the
+    window are let through again; false positives (a new message dropped as a
+    duplicate) stay below about error_rate overall while each generation holds
+    at most `capacity` distinct messages.
+    """
+
+    def __init__(self, notifier: Notifier, window: float = 60.0, capacity: int = 10000,
+                 error_rate: float = 0.001, generations: int = 4, clock: Callable[[], float] = time.monotonic):
+        super().__init__(notifier)
+        if window <= 0:
+            raise ValueError("window must be positive")
+        if generations < 2:
+            raise ValueError("generations must be at least 2")
+        # A message is checked against every generation, so their false
+        # positives add up; each filter gets an equal share of error_rate.
+        self._filters = [BloomFilter(capacity, error_rate / generations) for _ in range(generations)]
+        self._current = 0
+        self._slice = window / generations
+        self._clock = clock
+        self._rotated_at = clock()
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def send(self, message: str):
+        key = message.encode("utf-8")
+        with self._lock:
+            self._rotate()
+            if any(key in bloom for bloom in self._filters):
+                self.suppressed += 1
+                return
+            self._filters[self._current].add(key)
+        self._notifier.send(message)
+
+    def _rotate(self):
+        now = self._clock()
+        elapsed = int((now - self._rotated_at) // self._slice)
+        if elapsed <= 0:
+            return
+        for _ in range(min(elapsed, len(self._filters))):
+            self._current = (self._current + 1) % len(self._filters)
+            self._filters[self._current].clear()
+        self._rotated_at += elapsed * self._slice
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(len(bloom._bits) for bloom in self._filters)
+
+
+# Flattened stack of decorators
+class FlatNotifier(Notifier):
+    """
+    Holds the channel senders of a decorator stack in delivery order and calls
+    them from a single loop, so the cost per message doesn't include one
+    nested frame per decorator and deep stacks can't hit the recursion limit.
+    """
+
+    def __init__(self, senders: Iterable[Callable[[str], None]]):
+        self._senders = tuple(senders)
+
+    def send(self, message: str):
+        for sender in self._senders:
+            sender(message)
+
+    def __len__(self):
+        return len(self._senders)
+
+
+def flatten(notifier: Notifier) -> FlatNotifier:
+    """
+    Compiles a decorator stack into a FlatNotifier. The innermost component is
+    sent to first, matching the order of the nested super().send() calls.
+    """
+
+    senders: List[Callable[[str], None]] = []
+    while isinstance(notifier, NotifierDecorator):
+        # channel_sender() only describes the send() of the class defining it;
+        # a subclass overriding send() alone would lose its extra behavior.
+        owner = next(klass for klass in type(notifier).__mro__ if "channel_sender" in vars(klass))
+        if type(notifier).send is not owner.send:
+            raise TypeError(f"{type(notifier).__name__} overrides send() without a matching "
+                            f"channel_sender(); it can't be flattened")
+        sender = notifier.channel_sender()
+        if sender is not None:
+            senders.append(sender)
+        notifier = notifier._notifier
+    if isinstance(notifier, FlatNotifier):
+        senders.extend(reversed(notifier._senders))
+    else:
+        senders.append(notifier.send)
+    senders.reverse()
+    return FlatNotifier(senders)
+
+
+# Per-channel delivery metrics collected by FanOutNotifier
+class ChannelStats:
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.timed_out = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        attempts = self.sent + self.failed + self.retries
+        return self.total_latency / attempts if attempts else 0.0
+
+    def __repr__(self):
+        return (f"ChannelStats(sent={self.sent}, failed={self.failed}, retries={self.retries}, "
+                f"timed_out={self.timed_out}, "
+                f"mean_latency={self.mean_latency:.4f}s, max_latency={self.max_latency:.4f}s)")
+
+
+# One delivery's final outcome, claimed by whichever comes first: the worker
+# finishing or send() giving up on it, so each delivery is counted only once
+class _Delivery:
+    __slots__ = ("settled",)
+
+    def __init__(self):
+        self.settled = False
+
+
+# Concurrent fan-out to all channels of a notifier
+class FanOutNotifier(Notifier):
+    """
+    Sends a message to every channel at once on a thread pool, so the latency
+    of a message is that of the slowest channel instead of the sum of all of
+    them. Failed deliveries are retried with exponential backoff, each channel
+    has its own timeout, and at most max_in_flight deliveries run at a time:
+    send() blocks while that many are still pending, which pushes back on the
+    producer instead of queueing without bound.
+
+    A channel that times out keeps running in its worker thread (threads
+    can't be cancelled); it is reported as a TimeoutError to the caller and
+    counted as timed_out only, whatever the abandoned attempt ends with.
+    """
+
+    def __init__(self, channels: Dict[str, Callable[[str], None]], max_workers: Optional[int] = None,
+                 max_in_flight: Optional[int] = None, timeout: Optional[float] = None,
+                 timeouts: Optional[Dict[str, float]] = None, retries: int = 0, backoff: float = 0.1):
+        self._channels = dict(channels)
+        workers = max_workers or len(self._channels) or 1
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._in_flight = threading.BoundedSemaphore(max_in_flight or workers * 2)
+        self._timeout = timeout
+        self._timeouts = timeouts or {}
+        self._retries = retries
+        self._backoff = backoff
+        self._stats = {name: ChannelStats() for name in self._channels}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_stack(cls, notifier: Notifier, **kwargs) -> "FanOutNotifier":
+        """
+        Builds a fan-out notifier from the channels of a decorator stack, keyed
+        by the class that owns each channel. Repeated classes get a numbered
+        key ("EmailNotifier", "EmailNotifier#2", ...) so no channel is lost.
+        """
+
+        channels = {}
+        for sender in flatten(notifier)._senders:
+            owner = getattr(sender, "__self__", sender)
+            name = key = type(owner).__name__
+            number = 1
+            while key in channels:
+                number += 1
+                key = f"{name}#{number}"
+            channels[key] = sender
+        return cls(channels, **kwargs)
+
+    def send(self, message: str) -> Dict[str, Optional[BaseException]]:
+        """
+        Returns the outcome per channel: None on success, otherwise the error.
+        """
+
+        futures = {}
+        for name, channel in self._channels.items():
+            self._in_flight.acquire()
+            delivery = _Delivery()
+            future = self._executor.submit(self._deliver, name, channel, message, delivery)
+            future.add_done_callback(lambda _: self._in_flight.release())
+            futures[name] = (time.monotonic(), future, delivery)
+
+        outcome = {}
+        for name, (submitted, future, delivery) in futures.items():
+            timeout = self._timeouts.get(name, self._timeout)
+            remaining = None if timeout is None else max(0.0, submitted + timeout - time.monotonic())
+            try:
+                future.result(timeout=remaining)
+                outcome[name] = None
+            except TimeoutError as error:
+                with self._stats_lock:
+                    abandoned = not delivery.settled
+                    if abandoned:
+                        delivery.settled = True
+                        self._stats[name].timed_out += 1
+                # Otherwise it finished (and was counted) just as the wait ran
+                # out, so its real outcome is reported.
+                outcome[name] = error if abandoned else future.exception()
+            except Exception as error:
+                outcome[name] = error
+        return outcome
+
+    def _deliver(self, name: str, channel: Callable[[str], None], message: str, delivery: _Delivery) -> None:
+        delay = self._backoff
+        for attempt in range(self._retries + 1):
+            start = time.perf_counter()
+            try:
+                channel(message)
+            except Exception:
+                self._record(name, time.perf_counter() - start, ok=False, retry=attempt < self._retries,
+                             delivery=delivery)
+                if attempt == self._retries:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+            else:
+                self._record(name, time.perf_counter() - start, ok=True, delivery=delivery)
+                return
+
+    def _record(self, name: str, latency: float, ok: bool, retry: bool = False,
+                delivery: Optional[_Delivery] = None) -> None:
+        with self._stats_lock:
+            if not retry and delivery is not None:
+                if delivery.settled:
+                    return
+                delivery.settled = True
+            stats = self._stats[name]
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+            if ok:
+                stats.sent += 1
+            elif retry:
+                stats.retries += 1
+            else:
+                stats.failed += 1
+
+    def metrics(self) -> Dict[str, ChannelStats]:
+        return self._stats
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Local stand-in for a remote channel with an injected delay and failures
+class FakeChannel:
+    def __init__(self, name: str, delay: float = 0.0, failures: int = 0):
+        self.name = name
+        self.delay = delay
+        self._failures = failures
+
+    def __call__(self, message: str):
+        time.sleep(self.delay)
+        if self._failures > 0:
+            self._failures -= 1
+            raise ConnectionError(f"{self.name} is unavailable")
+        print(f"Sending {self.name} notification: {message}")
+
+
+def benchmark_dispatch(depths=(1, 10, 100, 1000), number=1000):
+    """
+    Compares nested and flattened dispatch through decorator stacks of the
+    given depths, using channels that do no work. Returns microseconds per
+    message for each depth; nested is None when the stack exceeds the
+    recursion limit.
+    """
+
+    class SilentNotifier(Notifier):
+        def send(self, message: str):
+            pass
+
+    class SilentChannel(NotifierDecorator):
+        def send(self, message: str):
+            super().send(message)
+            self.deliver(message)
+
+        def channel_sender(self):
+            return self.deliver
+
+        def deliver(self, message: str):
+            pass
+
+    results = {}
+    for depth in depths:
+        notifier = SilentNotifier()
+        for _ in range(depth):
+            notifier = SilentChannel(notifier)
+        flat = flatten(notifier)
+        try:
+            nested_time = timeit.timeit(lambda: notifier.send("ping"), number=number) / number * 1e6
+        except RecursionError:
+            nested_time = None
+        flat_time = timeit.timeit(lambda: flat.send("ping"), number=number) / number * 1e6
+        results[depth] = (nested_time, flat_time)
+    return results
+
 
 # Client code
 if __name__ == "__main__":
@@ -81,3 +638,40 @@ if __name__ == "__main__":
     notifier = SlackNotifier(notifier)
 
     notifier.send("Hello, world!")
+
+    print("\nSending a shared envelope encoded once:")
+    notifier.send_envelope(MessageEnvelope("Hello, world!"))
+
+    print("\nSuppressing an alert storm:")
+    deduplicating = DeduplicatingNotifier(notifier, window=60, capacity=1000)
+    for _ in range(1000):
+        deduplicating.send("Disk is full")
+    print(f"Suppressed {deduplicating.suppressed} duplicates using {deduplicating.memory_bytes} bytes")
+
+    print("\nSending in batches of 3:")
+    buffered = BufferedNotifier(notifier, max_batch_size=3, max_delay=0.1)
+    for number in range(1, 5):
+        buffered.send(f"Alert #{number}")
+    time.sleep(0.2)
+
+    print("\nThe same stack, flattened:")
+    flatten(notifier).send("Hello, world!")
+
+    print("\nFanning out to slow channels concurrently:")
+    channels = {
+        "email": FakeChannel("email", delay=0.2),
+        "sms": FakeChannel("SMS", delay=0.1, failures=1),
+        "slack": FakeChannel("Slack", delay=0.5),
+    }
+    with FanOutNotifier(channels, retries=2, backoff=0.05, timeouts={"slack": 0.3}) as fan_out:
+        start = time.perf_counter()
+        outcome = fan_out.send("Hello, world!")
+        print(f"Delivered in {time.perf_counter() - start:.2f}s: "
+              f"{ {name: type(error).__name__ if error else 'ok' for name, error in outcome.items()} }")
+        for name, stats in fan_out.metrics().items():
+            print(f"  {name}: {stats}")
+
+    print("\nDepth  nested (us/msg)  flat (us/msg)")
+    for depth, (nested_time, flat_time) in benchmark_dispatch().items():
+        nested = f"{nested_time:15.2f}" if nested_time is not None else "RecursionError".rjust(15)
+        print(f"{depth:5}  {nested}  {flat_time:13.2f}")
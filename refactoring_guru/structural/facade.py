@@ -10,6 +10,10 @@ Each component has its own interface and must be operated in a specific sequence
 The Facade pattern simplifies this process.
 """
 
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 
 class DVDPlayer:
     def on(self):
@@ -35,6 +39,11 @@ class Projector:
     def off(self):
         print("Projector is off.")
 
+    def batch(self, commands):
+        # A real projector would receive these in a single round trip.
+        for command, args in commands:
+            getattr(self, command)(*args)
+
 
 class Amplifier:
     def on(self):
@@ -46,36 +55,275 @@ class Amplifier:
     def off(self):
         print("Amplifier is off.")
 
+    def batch(self, commands):
+        for command, args in commands:
+            getattr(self, command)(*args)
+
 
 class Lights:
     def dim(self, level):
         print(f"Lights dimmed to {level}% brightness.")
 
 
+class Step:
+    """
+    A unit of work for run_steps. Steps that send a command to a device also
+    record which device, the command and its arguments, and the device state
+    the command leads to, which lets the facade skip or batch them.
+    """
+
+    def __init__(self, name, action, requires=(), device=None, commands=(), state=None):
+        self.name = name
+        self.action = action
+        self.requires = tuple(requires)
+        self.device = device
+        self.commands = tuple(commands)
+        self.state = state or {}
+
+
+class TimingReport:
+    def __init__(self):
+        self.steps = {}
+        self.skipped = []
+        self.total = 0.0
+
+    def __str__(self):
+        lines = [f"  {name:28} start {start:6.3f}s  took {duration:6.3f}s"
+                 for name, (start, duration) in sorted(self.steps.items(), key=lambda item: item[1][0])]
+        lines.extend(f"  {name:28} skipped, already in that state" for name in self.skipped)
+        lines.append(f"  {'total':28} {self.total:6.3f}s")
+        return "\n".join(lines)
+
+
+def run_steps(steps, max_workers=4):
+    """
+    Runs steps on a thread pool, starting each one as soon as the steps it
+    requires have finished, so independent steps overlap and the total time
+    is that of the longest dependency chain. If a step fails, no further
+    steps are started and the error is raised once the running ones finish.
+    """
+
+    by_name = {step.name: step for step in steps}
+    for step in steps:
+        for requirement in step.requires:
+            if requirement not in by_name:
+                raise ValueError(f"step {step.name!r} requires unknown step {requirement!r}")
+
+    report = TimingReport()
+    waiting = {step.name: set(step.requires) for step in steps}
+    started = time.perf_counter()
+    error = None
+
+    def timed(step):
+        start = time.perf_counter()
+        step.action()
+        report.steps[step.name] = (start - started, time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+        while True:
+            if error is None:
+                for name in [name for name, requires in waiting.items() if not requires]:
+                    del waiting[name]
+                    running[pool.submit(timed, by_name[name])] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                for requires in waiting.values():
+                    requires.discard(name)
+    if error is not None:
+        raise error
+    if waiting:
+        raise ValueError(f"steps {sorted(waiting)} have circular requirements")
+    report.total = time.perf_counter() - started
+    return report
+
+
 class HomeTheaterFacade:
-    def __init__(self, dvd_player, projector, amplifier, lights):
+    """
+    The facade remembers the last state it put every device in. Commands that
+    would not change anything are skipped, and the remaining commands for a
+    device that supports batch() are sent to it as one batch. If a device is
+    operated behind the facade's back, call forget_state() so the next
+    commands are all sent again.
+
+    Steps run one at a time in order unless max_workers is raised, in which
+    case independent steps overlap (see run_steps()).
+    """
+
+    def __init__(self, dvd_player, projector, amplifier, lights, max_workers=1):
         self.dvd_player = dvd_player
         self.projector = projector
         self.amplifier = amplifier
         self.lights = lights
+        self.max_workers = max_workers
+        self._state = {"dvd_player": {}, "projector": {}, "amplifier": {}, "lights": {}}
+
+    def _step(self, device, command, *args, requires=(), state=None):
+        target = getattr(self, device)
+        return Step(f"{device}.{command}", lambda: getattr(target, command)(*args), requires,
+                    device=device, commands=[(command, args)], state=state)
+
+    def watch_movie_steps(self, movie):
+        return [
+            self._step("lights", "dim", 10, state={"brightness": 10}),
+            self._step("projector", "on", state={"power": True}),
+            self._step("projector", "wide_screen_mode", requires=["projector.on"], state={"mode": "wide"}),
+            self._step("amplifier", "on", state={"power": True}),
+            self._step("amplifier", "set_volume", 5, requires=["amplifier.on"], state={"volume": 5}),
+            self._step("dvd_player", "on", state={"power": True}),
+            self._step("dvd_player", "play", movie,
+                       requires=["dvd_player.on", "amplifier.set_volume", "projector.wide_screen_mode"],
+                       state={"playing": movie}),
+        ]
+
+    def end_movie_steps(self):
+        # Switching a device off also forgets its settings (None = unknown),
+        # so they are sent again after the next power-on.
+        return [
+            self._step("dvd_player", "stop", state={"playing": None}),
+            self._step("dvd_player", "off", requires=["dvd_player.stop"], state={"power": False}),
+            self._step("amplifier", "off", requires=["dvd_player.stop"], state={"power": False, "volume": None}),
+            self._step("projector", "off", requires=["dvd_player.stop"], state={"power": False, "mode": None}),
+            self._step("lights", "dim", 100, requires=["dvd_player.stop"], state={"brightness": 100}),
+        ]
+
+    def plan(self, steps):
+        """
+        Returns the steps that still need to run, with batched commands, and
+        the names of the steps that were skipped.
+        """
+
+        skipped = {step.name for step in steps
+                   if step.device is not None and self._in_state(step.device, step.state)}
+        by_name = {step.name: step for step in steps}
+        remaining = [Step(step.name, step.action, self._effective_requires(step, skipped, by_name),
+                          step.device, step.commands, step.state)
+                     for step in steps if step.name not in skipped]
+        return self._batch(remaining), [step.name for step in steps if step.name in skipped]
+
+    @staticmethod
+    def _effective_requires(step, skipped, by_name):
+        # A skipped requirement is replaced by its own requirements, followed
+        # through any further skipped steps, so ordering the skipped step
+        # enforced (e.g. projector.on before play) still holds.
+        requires = []
+        stack = list(reversed(step.requires))
+        seen = set()
+        while stack:
+            name = stack.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            if name in skipped:
+                stack.extend(reversed(by_name[name].requires))
+            else:
+                requires.append(name)
+        return requires
+
+    def _in_state(self, device, state):
+        known = self._state[device]
+        return bool(state) and all(name in known and known[name] == value for name, value in state.items())
+
+    def _batch(self, steps):
+        by_name = {step.name: step for step in steps}
+        groups = {}
+        for step in steps:
+            if step.device is not None and hasattr(getattr(self, step.device), "batch"):
+                groups.setdefault(step.device, []).append(step)
+
+        for device, group in groups.items():
+            names = {step.name for step in group}
+            external = {name for step in group for name in step.requires} - names
+            # Merging is only safe if no outside step the batch would wait for
+            # itself waits for one of the batched commands.
+            if len(group) < 2 or self._reaches(external, names, by_name):
+                continue
+            state = {}
+            commands = []
+            for step in group:
+                state.update(step.state)
+                commands.extend(step.commands)
+            target = getattr(self, device)
+            merged = Step(f"{device}.batch", lambda target=target, commands=commands: target.batch(commands),
+                          sorted(external), device=device, commands=commands, state=state)
+            position = steps.index(group[0])
+            steps = [step for step in steps if step.name not in names]
+            steps.insert(position, merged)
+            for step in steps:
+                if names.intersection(step.requires):
+                    step.requires = tuple(dict.fromkeys(merged.name if name in names else name
+                                                        for name in step.requires))
+            by_name = {step.name: step for step in steps}
+        return steps
+
+    @staticmethod
+    def _reaches(starts, targets, by_name):
+        stack = list(starts)
+        seen = set()
+        while stack:
+            name = stack.pop()
+            if name in targets:
+                return True
+            if name not in seen and name in by_name:
+                seen.add(name)
+                stack.extend(by_name[name].requires)
+        return False
+
+    def _run(self, steps):
+        planned, skipped = self.plan(steps)
+        for step in planned:
+            if step.device is not None:
+                step.action = self._tracked(step)
+        report = run_steps(planned, self.max_workers)
+        report.skipped = skipped
+        return report
+
+    def _tracked(self, step):
+        action, known, state = step.action, self._state[step.device], step.state
+
+        def run_and_record():
+            action()
+            known.update(state)
+
+        return run_and_record
+
+    def forget_state(self, device=None):
+        for name in [device] if device else list(self._state):
+            self._state[name] = {}
 
     def watch_movie(self, movie):
         print("Get ready to watch a movie...")
-        self.lights.dim(10)
-        self.projector.on()
-        self.projector.wide_screen_mode()
-        self.amplifier.on()
-        self.amplifier.set_volume(5)
-        self.dvd_player.on()
-        self.dvd_player.play(movie)
+        return self._run(self.watch_movie_steps(movie))
 
     def end_movie(self):
         print("Shutting movie theater down...")
-        self.dvd_player.stop()
-        self.dvd_player.off()
-        self.amplifier.off()
-        self.projector.off()
-        self.lights.dim(100)
+        return self._run(self.end_movie_steps())
+
+
+# Stand-in for a real device that takes a while to respond to every command
+class SlowDevice:
+    # The waits overlap, but the commands themselves (which print) run one at
+    # a time so lines from different devices don't interleave.
+    _command_lock = threading.Lock()
+
+    def __init__(self, device, delay):
+        self._device = device
+        self._delay = delay
+
+    def __getattr__(self, name):
+        command = getattr(self._device, name)
+
+        def slow_command(*args, **kwargs):
+            time.sleep(self._delay)
+            with self._command_lock:
+                return command(*args, **kwargs)
+
+        return slow_command
 
 
 if __name__ == "__main__":
@@ -93,3 +341,16 @@ if __name__ == "__main__":
     print("\n")
     # End the movie
     home_theater.end_movie()
+    print("\n")
+
+    # With devices that take a while to respond, independent steps overlap
+    slow_theater = HomeTheaterFacade(SlowDevice(DVDPlayer(), 0.2), SlowDevice(Projector(), 0.3),
+                                     SlowDevice(Amplifier(), 0.2), SlowDevice(Lights(), 0.1),
+                                     max_workers=4)
+    print(slow_theater.watch_movie("Inception"))
+    print(slow_theater.end_movie())
+    print("\n")
+
+    # Back-to-back calls only send what actually changes
+    print(home_theater.watch_movie("Inception"))
+    print(home_theater.watch_movie("Interstellar"))
@@ -25,7 +25,12 @@ the objects contain duplicate states which can be extracted and shared between m
 
 """
 
+import threading
+import weakref
 from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 
 # Flyweight class representing shared state
@@ -38,21 +43,93 @@ class CharacterFlyweight:
     def render(self, position):
         print(f"Rendering character at {position} with font={self.font}, size={self.size}, color={self.color}")
 
+    def render_run(self, text, positions, out=None):
+        print(f"Rendering run '{text}' at {positions} with font={self.font}, size={self.size}, color={self.color}",
+              file=out)
+
 
 # Flyweight Factory for creating and managing flyweights
 class CharacterFlyweightFactory:
-    def __init__(self):
-        self._flyweights = {}
+    """
+    By default the factory keeps every flyweight forever. With weak=True the
+    flyweights are held in a WeakValueDictionary and disappear once no
+    character references them; with a capacity the factory keeps at most that
+    many flyweights and evicts the least recently used one. An evicted
+    flyweight still works for the characters holding it, but a later request
+    for the same style creates a new one.
+
+    Lookups of existing flyweights don't take a lock; creation is serialized
+    per key through a small set of striped locks. The LRU mode has to reorder
+    its entries on every hit, so it uses a single lock instead.
+    """
+
+    def __init__(self, weak: bool = False, capacity: Optional[int] = None, stripes: int = 16):
+        if weak and capacity is not None:
+            raise ValueError("choose either weak references or a capacity, not both")
+        if capacity is not None and capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if weak:
+            self._flyweights = weakref.WeakValueDictionary()
+        elif capacity is not None:
+            self._flyweights = OrderedDict()
+        else:
+            self._flyweights = {}
+        self._capacity = capacity
+        self._locks = [threading.Lock() for _ in range(max(1, stripes))]
+        # Counters are updated without a lock on the read path, so they are
+        # statistics rather than exact totals under heavy contention.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
     def get_flyweight(self, font, size, color):
         key = (font, size, color)
-        if key not in self._flyweights:
-            self._flyweights[key] = CharacterFlyweight(font, size, color)
-        return self._flyweights[key]
+        if self._capacity is not None:
+            return self._get_bounded(key)
+
+        flyweight = self._flyweights.get(key)
+        if flyweight is not None:
+            self.hits += 1
+            return flyweight
+        with self._locks[hash(key) % len(self._locks)]:
+            flyweight = self._flyweights.get(key)
+            if flyweight is None:
+                flyweight = CharacterFlyweight(font, size, color)
+                self._flyweights[key] = flyweight
+                self.misses += 1
+            else:
+                self.hits += 1
+        return flyweight
+
+    def _get_bounded(self, key):
+        with self._locks[0]:
+            flyweight = self._flyweights.get(key)
+            if flyweight is not None:
+                self._flyweights.move_to_end(key)
+                self.hits += 1
+                return flyweight
+            flyweight = CharacterFlyweight(*key)
+            self._flyweights[key] = flyweight
+            self.misses += 1
+            if len(self._flyweights) > self._capacity:
+                self._flyweights.popitem(last=False)
+                self.evictions += 1
+            return flyweight
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._flyweights),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
 
     def list_flyweights(self):
-        print(f"FlyweightFactory: {len(self._flyweights)} flyweights:")
-        for key in self._flyweights:
+        keys = list(self._flyweights.keys())
+        print(f"FlyweightFactory: {len(keys)} flyweights:")
+        for key in keys:
             print(key)
 
 
@@ -68,6 +145,157 @@ class Character:
         self.flyweight.render(self.position)
 
 
+# Column-oriented storage for the extrinsic state of many characters
+class CharacterStore:
+    """
+    Instead of one Character object per glyph, the store keeps the extrinsic
+    state in parallel typed arrays: code points, x/y positions and an integer
+    id of the flyweight. A glyph then costs a few bytes per column rather than
+    a full Python object, a tuple and a reference.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._flyweights = []
+        self._flyweight_ids = {}
+        self.chars = array('I')
+        self.xs = array('i')
+        self.ys = array('i')
+        self.flyweight_ids = array('I')
+
+    def _intern(self, font, size, color) -> int:
+        flyweight = self._factory.get_flyweight(font, size, color)
+        flyweight_id = self._flyweight_ids.get(id(flyweight))
+        if flyweight_id is None:
+            flyweight_id = len(self._flyweights)
+            self._flyweights.append(flyweight)
+            self._flyweight_ids[id(flyweight)] = flyweight_id
+        return flyweight_id
+
+    def append(self, char, font, size, color, position):
+        x, y = position
+        self.chars.append(ord(char))
+        self.xs.append(x)
+        self.ys.append(y)
+        self.flyweight_ids.append(self._intern(font, size, color))
+
+    def extend(self, text: str, font, size, color, positions: Iterable[Tuple[int, int]]):
+        """
+        Bulk-loads a run of text sharing one style; the flyweight is looked up
+        once for the whole run.
+        """
+
+        flyweight_id = self._intern(font, size, color)
+        start = len(self.chars)
+        self.chars.extend(ord(char) for char in text)
+        for x, y in positions:
+            self.xs.append(x)
+            self.ys.append(y)
+        added = len(self.chars) - start
+        if len(self.xs) != len(self.chars):
+            del self.chars[start:]
+            del self.xs[start:]
+            del self.ys[start:]
+            raise ValueError("text and positions must have the same length")
+        self.flyweight_ids.extend([flyweight_id] * added)
+
+    def __len__(self):
+        return len(self.chars)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CharacterStoreView(self, *index.indices(len(self)))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("CharacterStore index out of range")
+        return (chr(self.chars[index]), (self.xs[index], self.ys[index]),
+                self._flyweights[self.flyweight_ids[index]])
+
+    def flyweight(self, flyweight_id) -> CharacterFlyweight:
+        return self._flyweights[flyweight_id]
+
+    def render(self):
+        for index in range(len(self)):
+            char, position, flyweight = self[index]
+            print(f"Rendering character '{char}'")
+            flyweight.render(position)
+
+
+# A slice of a CharacterStore which shares the store's columns instead of copying them
+class CharacterStoreView:
+    def __init__(self, store, start, stop, step=1):
+        self._store = store
+        self._range = range(start, stop, step)
+
+    def __len__(self):
+        return len(self._range)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            sub = self._range[index]
+            return CharacterStoreView(self._store, sub.start, sub.stop, sub.step)
+        return self._store[self._range[index]]
+
+    def __iter__(self):
+        for index in self._range:
+            yield self._store[index]
+
+    @property
+    def text(self) -> str:
+        chars = self._store.chars
+        return ''.join(chr(chars[index]) for index in self._range)
+
+
+# Batch renderer grouping consecutive characters into style runs
+class StyleRunRenderer:
+    """
+    Consecutive characters sharing the same flyweight form a style run, and
+    the renderer makes a single render_run call per run instead of one render
+    call per glyph. Input is consumed lazily and runs are capped at
+    max_run_length, so arbitrarily long documents are streamed with bounded
+    memory.
+
+    Accepts Character objects as well as the (char, position, flyweight)
+    tuples produced by a CharacterStore.
+    """
+
+    def __init__(self, out=None, max_run_length: int = 4096):
+        if max_run_length <= 0:
+            raise ValueError("max_run_length must be positive")
+        self._out = out
+        self._max_run_length = max_run_length
+
+    def runs(self, characters) -> Iterator[Tuple[CharacterFlyweight, str, List[Tuple[int, int]]]]:
+        current = None
+        chars: List[str] = []
+        positions: List[Tuple[int, int]] = []
+        for item in characters:
+            if isinstance(item, Character):
+                char, position, flyweight = item.char, item.position, item.flyweight
+            else:
+                char, position, flyweight = item
+            if flyweight is not current or len(chars) == self._max_run_length:
+                if chars:
+                    yield current, ''.join(chars), positions
+                current, chars, positions = flyweight, [], []
+            chars.append(char)
+            positions.append(position)
+        if chars:
+            yield current, ''.join(chars), positions
+
+    def render(self, characters) -> int:
+        """
+        Renders all characters and returns the number of flyweight calls made.
+        """
+
+        calls = 0
+        for flyweight, text, positions in self.runs(characters):
+            flyweight.render_run(text, positions, out=self._out)
+            calls += 1
+        return calls
+
+
 # Client code
 if __name__ == "__main__":
     factory = CharacterFlyweightFactory()
@@ -84,3 +312,15 @@ if __name__ == "__main__":
         character.render()
 
     factory.list_flyweights()
+    print(f"FlyweightFactory stats: {factory.stats()}")
+
+    # The same document kept in a column-oriented store
+    store = CharacterStore(factory)
+    store.extend('aba', 'Arial', 12, 'black', [(10, 20), (20, 20), (30, 20)])
+    store.extend('cd', 'Courier', 14, 'red', [(40, 20), (50, 20)])
+    store.render()
+    print(f"Store holds {len(store)} characters, slice [1:4] reads '{store[1:4].text}'")
+
+    # Rendering by style runs: one flyweight call per run instead of per glyph
+    calls = StyleRunRenderer().render(characters)
+    print(f"Rendered {len(characters)} characters with {calls} flyweight calls")
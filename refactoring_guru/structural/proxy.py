@@ -28,7 +28,13 @@ USECASE:
 
 """
 
+import asyncio
+import math
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
 
 
 # Subject Interface
@@ -62,6 +68,283 @@ class Proxy(Subject):
         print("Proxy: Logging the time of request.")
 
 
+# Virtual Proxy
+class VirtualProxy(Proxy):
+    """
+    The Virtual Proxy receives a factory instead of a ready RealSubject and
+    builds the heavy object only on the first request (or on an explicit
+    warm_up). Initialization is guarded by a lock with a double check, so it
+    runs exactly once even when many threads hit the proxy at the same time.
+    """
+
+    def __init__(self, factory: Callable[[], RealSubject]):
+        self._factory = factory
+        self._real_subject: Optional[RealSubject] = None
+        self._lock = threading.Lock()
+        self._init_time: Optional[float] = None
+
+    @property
+    def is_initialized(self) -> bool:
+        return self._real_subject is not None
+
+    @property
+    def init_time(self) -> Optional[float]:
+        """
+        Seconds spent in the factory, or None if the subject was not built yet.
+        """
+
+        return self._init_time
+
+    def warm_up(self) -> RealSubject:
+        # The fast path skips the lock entirely once the subject exists.
+        if self._real_subject is None:
+            with self._lock:
+                if self._real_subject is None:
+                    start = time.perf_counter()
+                    real_subject = self._factory()
+                    self._init_time = time.perf_counter() - start
+                    self._real_subject = real_subject
+        return self._real_subject
+
+    def request(self):
+        if self.check_access():
+            self.warm_up().request()
+            self.log_access()
+
+
+# Caching Proxy
+class CachingProxy(Proxy):
+    """
+    The Caching Proxy memoizes the results of RealSubject.request by argument
+    key. Entries are kept in least-recently-used order and evicted once the
+    cache grows past max_size; each entry also expires ttl seconds after it was
+    stored. Hit, miss and eviction counters can be read at any time.
+    """
+
+    def __init__(self, real_subject: RealSubject, max_size: int = 128, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        super().__init__(real_subject)
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+        self._cache: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _make_key(args, kwargs) -> Hashable:
+        return args, frozenset(kwargs.items())
+
+    def request(self, *args, **kwargs):
+        if not self.check_access():
+            return None
+        key = self._make_key(args, kwargs)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or self._clock() < expires_at:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._cache[key]
+            self.misses += 1
+
+        # The backend call happens outside the lock so slow requests for
+        # different keys don't serialize each other.
+        value = self._real_subject.request(*args, **kwargs)
+        self.log_access()
+
+        expires_at = None if self._ttl is None else self._clock() + self._ttl
+        with self._lock:
+            self._cache[key] = (value, expires_at)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, *args, **kwargs) -> bool:
+        with self._lock:
+            return self._cache.pop(self._make_key(args, kwargs), None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+# Instrumentation interface used by InstrumentedProxy
+class AccessInstrumentation:
+    """
+    The default instrumentation is disabled: the proxy checks a single
+    attribute and forwards the request without timing anything.
+    """
+
+    enabled = False
+
+    def sample(self) -> bool:
+        return False
+
+    def record(self, latency: float) -> None:
+        pass
+
+
+# Concrete Instrumentation keeping the latest latencies in a ring buffer
+class LatencyRecorder(AccessInstrumentation):
+    """
+    Records per-request latency (seconds) into a fixed-size ring buffer, so
+    memory stays constant no matter how many requests go through. With
+    sample_rate below 1 that fraction of requests is timed, spread evenly. Percentiles are
+    computed on demand from the samples currently in the buffer.
+    """
+
+    enabled = True
+
+    def __init__(self, capacity: int = 1024, sample_rate: float = 1.0):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in (0, 1]")
+        self._samples: List[float] = [0.0] * capacity
+        self._capacity = capacity
+        self._index = 0
+        self._count = 0
+        self._sample_rate = sample_rate
+        self._credit = 0.0
+        self._lock = threading.Lock()
+
+    def sample(self) -> bool:
+        if self._sample_rate == 1:
+            return True
+        # Each request earns sample_rate of credit and one full unit buys a
+        # sample, so exactly the configured fraction is timed in the long run.
+        self._credit += self._sample_rate
+        if self._credit >= 1:
+            self._credit -= 1
+            return True
+        return False
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._samples[self._index] = latency
+            self._index = (self._index + 1) % self._capacity
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        """
+        Total number of recorded samples, including those already overwritten.
+        """
+
+        return self._count
+
+    def percentiles(self, *percents: float) -> Dict[float, float]:
+        with self._lock:
+            window = sorted(self._samples[:min(self._count, self._capacity)])
+        if not window:
+            return {p: 0.0 for p in percents}
+        # Nearest-rank percentile over the samples still in the buffer.
+        return {p: window[min(len(window) - 1, max(0, math.ceil(p / 100 * len(window)) - 1))]
+                for p in percents}
+
+
+# Instrumented Proxy
+class InstrumentedProxy(Proxy):
+    """
+    Replaces the printing check_access/log_access hooks with a pluggable
+    instrumentation object, so the proxy adds no I/O on the request path.
+    """
+
+    def __init__(self, real_subject: RealSubject, instrumentation: Optional[AccessInstrumentation] = None):
+        super().__init__(real_subject)
+        self.instrumentation = instrumentation or AccessInstrumentation()
+
+    def request(self):
+        instrumentation = self.instrumentation
+        if not self.check_access():
+            return None
+        if not instrumentation.enabled or not instrumentation.sample():
+            return self._real_subject.request()
+        start = time.perf_counter()
+        result = self._real_subject.request()
+        instrumentation.record(time.perf_counter() - start)
+        return result
+
+    def check_access(self) -> bool:
+        return True
+
+    def log_access(self):
+        pass
+
+
+# Async Subject Interface
+class AsyncSubject(ABC):
+    @abstractmethod
+    async def request(self, key: Hashable):
+        pass
+
+
+# Async RealSubject with an artificial latency standing in for a slow backend
+class AsyncRealSubject(AsyncSubject):
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    async def request(self, key: Hashable):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return f"RealSubject: Handled request for {key!r}."
+
+
+# Async Proxy with single-flight request coalescing
+class AsyncProxy(AsyncSubject):
+    """
+    Concurrent awaiters of the same key share one in-flight call to the
+    RealSubject instead of each firing their own. Once that call completes, the
+    next request for the key goes to the backend again, so this deduplicates
+    work without caching results.
+    """
+
+    def __init__(self, real_subject: AsyncSubject):
+        self._real_subject = real_subject
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def request(self, key: Hashable):
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._real_subject.request(key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        # Shielding keeps one cancelled awaiter from cancelling the shared call
+        # for everyone else.
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+
+async def async_client_code(proxy: AsyncProxy, real_subject: AsyncRealSubject) -> None:
+    results = await asyncio.gather(*(proxy.request("report") for _ in range(10)))
+    print(results[0])
+    print(f"10 concurrent requests, {real_subject.calls} backend call(s), {proxy.coalesced} coalesced")
+
+
 # Client code
 if __name__ == "__main__":
     real_subject = RealSubject()
@@ -69,3 +352,34 @@ if __name__ == "__main__":
 
     print("Client: Executing the client code with a proxy:")
     proxy.request()
+
+    print("\nClient: Executing the client code with a virtual proxy:")
+    virtual_proxy = VirtualProxy(RealSubject)
+    print(f"Initialized before first request: {virtual_proxy.is_initialized}")
+    virtual_proxy.request()
+    print(f"Initialized after first request: {virtual_proxy.is_initialized} "
+          f"(took {virtual_proxy.init_time:.6f}s)")
+
+    print("\nClient: Executing the client code with a caching proxy:")
+    caching_proxy = CachingProxy(RealSubject(), max_size=8, ttl=60)
+    caching_proxy.request()
+    caching_proxy.request()
+    print(f"hits={caching_proxy.hits}, misses={caching_proxy.misses}, "
+          f"evictions={caching_proxy.evictions}, hit rate={caching_proxy.hit_rate:.0%}")
+
+    print("\nClient: Executing the client code with an instrumented proxy:")
+
+    class QuietSubject(RealSubject):
+        def request(self):
+            return sum(range(1000))
+
+    recorder = LatencyRecorder(capacity=256, sample_rate=0.5)
+    instrumented_proxy = InstrumentedProxy(QuietSubject(), recorder)
+    for _ in range(1000):
+        instrumented_proxy.request()
+    p50, p99 = recorder.percentiles(50, 99).values()
+    print(f"{recorder.count} samples recorded, p50={p50 * 1e6:.1f}us, p99={p99 * 1e6:.1f}us")
+
+    print("\nClient: Executing the client code with an async coalescing proxy:")
+    async_real_subject = AsyncRealSubject(latency=0.05)
+    asyncio.run(async_client_code(AsyncProxy(async_real_subject), async_real_subject))